@@ -0,0 +1,167 @@
+
+from typing import Optional, List, Tuple, Union, Iterator, Callable, \
+    Any, Pattern
+import csv
+import mmap
+import re
+
+
+ByteBuffer = Union[bytes, bytearray, mmap.mmap]
+
+# The common form of a header, `[name]` with optional trailing commas.
+# Every line it matches is also a header by the csv-based rule in
+# `_parse_header_row`, which decides for all other lines.
+_HEADER_RE = re.compile(r'\[([^\]\n\r,"]*)\],*\r?\Z')
+_LONE_CR_RE = re.compile(rb"\r(?!\n)")
+
+# Lines that may be headers: those whose first CSV field, once
+# stripped, can start with "[". Before the "[" there can only be
+# whitespace and quotes, as in ` [name]` or `"[name]"`.
+_SPACE = "\t\x0b\x0c\r\x1c-\x20\x85\xa0\u1680\u2000-\u200a\u2028\u2029" \
+    "\u202f\u205f\u3000"
+_CANDIDATE = '[' + _SPACE + '"]*\\['
+_CANDIDATE_RE = re.compile(_CANDIDATE)
+_TEXT_CANDIDATES = (_CANDIDATE_RE, re.compile("\n" + _CANDIDATE))
+
+# The same for UTF-8 or ASCII bytes, where the non-ASCII whitespace is
+# let through by its lead and continuation bytes. That lets some other
+# lines through too, which `parse_header` then rejects.
+_BYTES_CANDIDATE = rb'[\t\x0b\x0c\r\x1c-\x20"\x80-\xbf\xc2\xe1-\xe3]*\['
+_BYTES_CANDIDATES = (re.compile(_BYTES_CANDIDATE),
+                     re.compile(b"\n" + _BYTES_CANDIDATE))
+
+
+def is_header_candidate(line: str) -> bool:
+    """
+    Whether `line` may be a section header. Lines for which this is
+    False can be skipped without calling `parse_header`.
+    """
+
+    return _CANDIDATE_RE.match(line) is not None
+
+
+def parse_header(line: str) -> Optional[str]:
+    """
+    Return the section name if `line`, with or without its line
+    terminator, is a section header such as `[name]` or `[name],,`.
+    """
+
+    if line.endswith("\n"):
+        line = line[:-1]
+
+    match = _HEADER_RE.match(line)
+    if match:
+        return match.group(1)
+
+    return _parse_header_row(line)
+
+
+def _parse_header_row(line: str) -> Optional[str]:
+    """
+    A line is a header if its first CSV field, stripped of whitespace,
+    is enclosed in square brackets, and all other fields are empty.
+    """
+
+    if not line:
+        return None
+
+    row = next(csv.reader([line]), None)
+    if not row:
+        return None
+
+    first = row[0].strip()
+    rest = row[1:]
+
+    if first.startswith("[") and \
+       first.endswith("]") and \
+       all(not x for x in rest):
+        return first[1:-1]
+
+    return None
+
+
+def has_lone_cr(buf: ByteBuffer) -> bool:
+    """
+    Whether `buf` contains a carriage return that is not part of a
+    "\\r\\n" pair. The text layer treats those as line breaks too, so
+    `scan_headers` would disagree with it on such content.
+    """
+
+    return _LONE_CR_RE.search(buf) is not None
+
+
+def scan_headers(buf: ByteBuffer, encoding: str,
+                 errors: str = "strict") -> List[Tuple[str, int, int]]:
+    """
+    Return a `(name, start, end)` triple for every section in `buf`,
+    where `start` and `end` are the byte offsets of the section's
+    content. Only lines that may be headers are ever decoded, and they
+    are found with a single regular expression search, so the loop
+    runs once per header candidate rather than once per line. This is
+    the part of section discovery that would move to native code if
+    the package ever ships one.
+
+    `encoding` must be one in which the bytes "[" and "\\n" always
+    stand for themselves, such as UTF-8 or ASCII.
+    """
+
+    def decode(line: bytes) -> str:
+        return line.decode(encoding, errors)
+
+    return _scan(buf, b"\n", _BYTES_CANDIDATES, decode)
+
+
+def scan_text_headers(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Like `scan_headers`, but for content that is already decoded, with
+    character offsets instead of byte offsets. Lines are only split at
+    "\\n", so `text` must not contain carriage returns.
+    """
+
+    return _scan(text, "\n", _TEXT_CANDIDATES, str)
+
+
+def _scan(buf: Any, newline: Any,
+          candidates: Tuple[Pattern[Any], Pattern[Any]],
+          decode: Callable[[Any], str]) -> List[Tuple[str, int, int]]:
+    # `buf` is a ByteBuffer or a str, with `newline` and `candidates`
+    # of the matching type.
+
+    result: List[Tuple[str, int, int]] = []
+    size = len(buf)
+    current_section: Optional[str] = None
+    section_start = 0
+
+    for line_start in _header_candidates(buf, candidates):
+        line_end = buf.find(newline, line_start)
+        if line_end < 0:
+            line_end = size
+
+        name = parse_header(decode(buf[line_start:line_end]))
+        if name is not None:
+            if current_section is not None:
+                result.append((current_section, section_start, line_start))
+            current_section = name
+            section_start = min(line_end + 1, size)
+
+    if current_section is not None:
+        result.append((current_section, section_start, size))
+
+    return result
+
+
+def _header_candidates(buf: Any,
+                       candidates: Tuple[Pattern[Any], Pattern[Any]]) \
+        -> Iterator[int]:
+    """
+    Yield the offsets of all lines in `buf` that may be headers.
+    `candidates` holds a pattern that matches at the start of such a
+    line, and one that finds the line breaks preceding them.
+    """
+
+    first_line, line_break = candidates
+    if first_line.match(buf):
+        yield 0
+
+    for match in line_break.finditer(buf):
+        yield match.start() + 1
@@ -1,15 +1,66 @@
 
-from typing import TextIO, Optional, Type, List, MutableMapping, Iterator
-import csv
-import shutil
+from typing import TextIO, Optional, Type, List, Dict, Set, \
+    MutableMapping, Iterator, Iterable, Tuple, Callable, NamedTuple, Union
+import codecs
+import mmap
 import os
 import io
+import weakref
 from .subtextio import SubTextIO
+from ._scanner import parse_header as _parse_header, scan_headers, \
+    scan_text_headers, has_lone_cr, is_header_candidate
 from .exceptions import OpOnClosedCSVFileError, CSVFileBaseIOClosed, \
-    SectionNotFound, BrokenTell
+    SectionNotFound, BrokenTell, InvalidSubtextCoordinates, \
+    EndsBeyondBaseContent
 from .section import MultiCSVSection
 
 
+# Encodings in which the bytes "[" and "\n" always stand for themselves.
+_MAPPABLE_ENCODINGS = ("utf-8", "ascii")
+
+
+def _advise(file: TextIO, advice: str) -> None:
+    """
+    Tell the kernel how the whole of `file` is about to be accessed,
+    if it is a real file on a platform with `os.posix_fadvise`.
+    """
+
+    try:
+        os.posix_fadvise(file.fileno(), 0, 0, getattr(os, advice))
+    except (AttributeError, OSError, ValueError):
+        pass
+
+
+def _scans_back(name: str, content: str, is_last: bool) -> bool:
+    """
+    Whether scanning a file for section headers finds a section named
+    `name` with exactly `content`, where it was written as such. That
+    fails if the content runs into the next header, or has lines or
+    carriage returns that could be read as line breaks or headers.
+    """
+
+    if not is_last and content and not content.endswith("\n"):
+        return False
+
+    if "\r" in name + content or "\n" in name \
+       or _parse_header(f"[{name}]") != name:
+        return False
+
+    return not scan_text_headers(content)
+
+
+class _PendingSection(NamedTuple):
+    """
+    A section found in the base file that has not been accessed yet.
+    Its SubTextIO view is only created on first access.
+    """
+
+    name: str
+    start: int
+    end: int
+    base_length: int
+
+
 class MultiCSVFile(MutableMapping[str, TextIO]):
     """
     MultiCSVFile provides an interface for reading, writing, and manipulating
@@ -32,7 +83,8 @@ class MultiCSVFile(MutableMapping[str, TextIO]):
     encapsulated within bracketed headers (e.g., [section_name]).
     - Each section is represented by a MultiCSVSection that holds a
     descriptor to a SubTextIO object, allowing isolated operations
-    within that section.
+    within that section. The SubTextIO is created when the section is
+    first accessed.
     - Operations like reading, writing, iterating, and deleting sections are
     supported.
     - Changes in sections are committed back to the base CSV file when
@@ -57,6 +109,7 @@ class MultiCSVFile(MutableMapping[str, TextIO]):
     - `__iter__() -> Iterator[str]`: Iterates over the section names.
     - `__len__() -> int`: Returns the number of sections.
     - `__contains__(key: object) -> bool`: Checks if a specific section exists.
+    - `preload() -> None`: Reads the content of all sections up front.
     - `close() -> None`: Closes the MultiCSVFile and flushes any
       uncommitted changes.
     - `flush() -> None`: Commits changes in sections back to the base CSV file.
@@ -106,89 +159,156 @@ class MultiCSVFile(MutableMapping[str, TextIO]):
     back to the base CSV file.
     - Mixing reading/writing operations from MultiCSVFile and the base TextIO
     directly may cause inconsistencies.
+    - Flushing a single section writes out the whole file, because
+    resizing a section moves the sections that follow it.
     """
 
-    def __init__(self, file: TextIO, own: bool = False):
+    def __init__(self, file: TextIO, own: bool = False,
+                 sections_hint: Optional[Iterable[Tuple[str, int, int]]]
+                 = None):
         self._initialized = False
         self._need_flush = False
         self._own_file = own
         self._file = file
         self._closed = self._file.closed
-        self._sections: List[MultiCSVSection] = []
-        self._initialize_sections()
+        self._sections: List[Union[MultiCSVSection, _PendingSection]] = []
+        self._index: Dict[str, int] = {}
+        # Sections whose descriptor has not been handed out yet, and so
+        # is still at position 0.
+        self._untouched: Set[str] = set()
+        # Told where each section was written, right after `flush`
+        # has written the base file, or None if a scan of the file
+        # would find other sections.
+        self._on_flush: Optional[
+            Callable[[Optional[List[Tuple[str, int, int]]]], None]] = None
+        # Given to the views on the base file, which flush through it.
+        self._flush_ref = weakref.WeakMethod(self.flush)
+        if sections_hint is None:
+            self._initialize_sections()
+        else:
+            base_length = self._base_length()
+            for name, start, end in sections_hint:
+                self._add_section(name, start, end, base_length)
         self._initialized = True
 
     def __getitem__(self, key: str) -> TextIO:
         self._check_closed()
 
-        for item in self._sections:
-            if item.name == key:
-                item.descriptor.seek(0)
-                return item.descriptor
+        i = self._index.get(key)
+        if i is None:
+            raise SectionNotFound("MultiCSVFile does not "
+                                  f"have section named {key!r}.")
 
-        raise SectionNotFound("MultiCSVFile does not "
-                              f"have section named {key!r}.")
+        return self._rewound(key, i)
 
     def __setitem__(self, key: str, value: TextIO) -> None:
         self._check_closed()
 
-        def make_section() -> MultiCSVSection:
-            return MultiCSVSection(name=key, descriptor=value)
-
-        for i, item in enumerate(self._sections):
-            if item.name == key:
-                self._sections[i] = make_section()
-                self._need_flush = True
-                return
+        section = MultiCSVSection(name=key, descriptor=value)
+        self._untouched.discard(key)
+        i = self._index.get(key)
+        if i is None:
+            self._index[key] = len(self._sections)
+            self._sections.append(section)
+        else:
+            self._drop(i, keep=value)
+            self._sections[i] = section
 
-        self._sections.append(make_section())
         self._need_flush = True
 
     def __delitem__(self, key: str) -> None:
         self._check_closed()
 
-        found = None
-        for i, item in enumerate(self._sections):
-            if item.name == key:
-                found = i
-                break
-
-        if found is None:
+        i = self._index.pop(key, None)
+        if i is None:
             raise SectionNotFound("MultiCSVFile does not "
                                   f"have section named {key!r}.")
-        else:
-            del self._sections[found]
-            self._need_flush = True
+
+        self._untouched.discard(key)
+        self._drop(i)
+        del self._sections[i]
+        for j in range(i, len(self._sections)):
+            name = self._sections[j].name
+            if self._index.get(name) == j + 1:
+                self._index[name] = j
+            elif name == key and key not in self._index:
+                # A later section of the same name takes the place of
+                # the deleted one, and has not been handed out yet.
+                self._index[key] = j
+                self._untouched.add(key)
+
+        self._need_flush = True
 
     def __iter__(self) -> Iterator[str]:
         self._check_closed()
-
-        for section in self._sections:
-            yield section.name
+        return (section.name for section in self._sections)
 
     def __len__(self) -> int:
         return len(self._sections)
 
     def __contains__(self, key: object) -> bool:
         self._check_closed()
+        return key in self._index
+
+    def section(self, name: str) -> TextIO:
+        self._check_closed()
 
-        for item in self._sections:
-            if item.name == key:
-                return True
+        i = self._index.get(name)
+        if i is None:
+            descriptor: TextIO = io.StringIO("")
+            self._index[name] = len(self._sections)
+            self._sections.append(MultiCSVSection(name=name,
+                                                  descriptor=descriptor))
+            self._need_flush = True
+            return descriptor
 
-        return False
+        return self._rewound(name, i)
 
-    def section(self, name: str) -> TextIO:
-        if name not in self:
-            self[name] = io.StringIO("")
+    def _rewound(self, name: str, i: int) -> TextIO:
+        """
+        Return the descriptor of the `i`-th section, positioned at its
+        start.
+        """
+
+        descriptor = self._section(i).descriptor
+        if name in self._untouched:
+            self._untouched.remove(name)
+        else:
+            descriptor.seek(0)
+        return descriptor
+
+    def _drop(self, i: int, keep: Optional[TextIO] = None) -> None:
+        """
+        Let go of the view of the `i`-th section, which is about to be
+        deleted or replaced by `keep`. The caller may still hold it,
+        so it is detached from the base file with its content.
+        """
 
-        return self[name]
+        section = self._sections[i]
+        if isinstance(section, MultiCSVSection) \
+           and section.descriptor is not keep \
+           and isinstance(section.descriptor, SubTextIO) \
+           and section.descriptor.base_io is self._file:
+            section.descriptor._detach()
+
+    def preload(self) -> None:
+        """
+        Read the content of all sections from the base file now, in
+        one pass, rather than each on its first access.
+        """
+
+        self._check_closed()
+        self._load_views()
 
     def close(self) -> None:
         if not self._closed:
             try:
                 self.flush()
+                # Views that were handed out can be read after the
+                # base file is closed.
+                self._load_views(handed_out=True)
             finally:
+                _advise(self._file, "POSIX_FADV_NORMAL")
                 if self._own_file:
                     try:
                         self._file.close()
@@ -197,37 +317,110 @@ class MultiCSVFile(MutableMapping[str, TextIO]):
                 else:
                     self._closed = True
 
-    def _write_section(self, section: MultiCSVSection) -> None:
-        self._file.write(f"[{section.name}]\n")
+    def _section(self, i: int) -> MultiCSVSection:
+        """
+        Return the `i`-th section, creating its view if it is pending.
+        """
 
-        initial_section_pos = section.descriptor.tell()
+        section = self._sections[i]
+        if isinstance(section, _PendingSection):
+            descriptor = SubTextIO(self._file,
+                                   start=section.start, end=section.end,
+                                   base_length=section.base_length)
+            descriptor._owner_flush = self._flush_ref
+            section = MultiCSVSection(name=section.name,
+                                      descriptor=descriptor)
+            self._sections[i] = section
+        return section
+
+    def _has_modified_sections(self) -> bool:
+        return any(isinstance(section, MultiCSVSection)
+                   and isinstance(section.descriptor, SubTextIO)
+                   and section.descriptor.modified
+                   for section in self._sections)
+
+    def _section_content(self, section: MultiCSVSection) -> str:
+        descriptor = section.descriptor
+        if isinstance(descriptor, SubTextIO) \
+           and descriptor.base_io is self._file:
+            return descriptor._content()
+
+        initial_section_pos = descriptor.tell()
         try:
-            section.descriptor.seek(0)
-            shutil.copyfileobj(section.descriptor, self._file)
+            descriptor.seek(0)
+            return descriptor.read()
         finally:
-            section.descriptor.seek(initial_section_pos)
+            descriptor.seek(initial_section_pos)
+
+    def _write_section(self, section: MultiCSVSection, content: str,
+                       is_last: bool) -> Tuple[str, int, int]:
+        self._file.write(f"[{section.name}]\n")
+        start = self._file.tell()
+        self._file.write(content)
+        end = self._file.tell()
+
+        descriptor = section.descriptor
+        if isinstance(descriptor, SubTextIO) \
+           and descriptor.base_io is self._file:
+            # Point the view at where its content now lives.
+            descriptor._relocate(start, end, is_last)
+
+        return (section.name, start, end)
+
+    def _load_views(self, handed_out: bool = False) -> None:
+        # Sections are kept in file order, so this is a single forward
+        # pass over the base file. With `handed_out`, sections whose
+        # view has not been created are skipped.
+        for i in range(len(self._sections)):
+            if handed_out and isinstance(self._sections[i], _PendingSection):
+                continue
+            descriptor = self._section(i).descriptor
+            if isinstance(descriptor, SubTextIO) \
+               and descriptor.base_io is self._file:
+                descriptor._ensure_loaded()
+
+    def _write_file(self) -> Optional[List[Tuple[str, int, int]]]:
+        # Views read their content lazily, and their extents are about
+        # to be overwritten. Everything is read before the base file is
+        # cut, so a section that cannot be read leaves it as it was.
+        sections = [self._section(i) for i in range(len(self._sections))]
+        contents = [self._section_content(section) for section in sections]
 
-    def _write_file(self) -> None:
         self._file.seek(0)
         self._file.truncate()
 
-        for section in self._sections:
-            self._write_section(section)
+        last = len(sections) - 1
+        extents = [self._write_section(section, content, is_last=i == last)
+                   for i, (section, content)
+                   in enumerate(zip(sections, contents))]
+
+        # Where the sections were written is only worth recording if
+        # scanning the file would find them there too.
+        if self._on_flush is None or \
+           not all(_scans_back(section.name, content, is_last=i == last)
+                   for i, (section, content)
+                   in enumerate(zip(sections, contents))):
+            return None
+
+        return extents
 
     def flush(self) -> None:
         if self._file.closed:
             raise CSVFileBaseIOClosed("Base file is closed in flush.")
 
-        if not self._need_flush:
+        if not self._need_flush and not self._has_modified_sections():
             return
 
         initial_file_pos = self._file.tell()
         try:
-            self._write_file()
+            extents = self._write_file()
             self._need_flush = False
         finally:
             self._file.seek(initial_file_pos)
 
+        if self._on_flush is not None:
+            self._on_flush(extents)
+
     def __enter__(self) -> 'MultiCSVFile':
         return self
 
@@ -237,57 +430,152 @@ class MultiCSVFile(MutableMapping[str, TextIO]):
                  exc_tb: Optional[object]) -> None:
         self.close()
 
+    def _base_length(self) -> int:
+        initial_file_pos = self._file.tell()
+        try:
+            self._file.seek(0, os.SEEK_END)
+            return self._file.tell()
+        finally:
+            self._file.seek(initial_file_pos)
+
+    def _add_section(self, name: str, start: int, end: int,
+                     base_length: int) -> None:
+        if end < start or start < 0:
+            raise InvalidSubtextCoordinates(
+                f"Invalid range [{start},{end}] for section {name!r}.")
+        if end > base_length:
+            raise EndsBeyondBaseContent(
+                f"Section {name!r} ends beyond the base file.")
+
+        section = _PendingSection(name=name, start=start, end=end,
+                                  base_length=base_length)
+        i = len(self._sections)
+        if self._index.setdefault(name, i) == i:
+            self._untouched.add(name)
+        self._sections.append(section)
+
+    def _section_extents(self) -> List[Tuple[str, int, int]]:
+        """
+        Return `(name, start, end)` for every section that is a view
+        on the base file, in the form accepted by `sections_hint`.
+        """
+
+        result: List[Tuple[str, int, int]] = []
+        for section in self._sections:
+            if isinstance(section, _PendingSection):
+                result.append((section.name, section.start, section.end))
+            elif isinstance(section.descriptor, SubTextIO) \
+                    and section.descriptor.base_io is self._file:
+                result.append((section.name,
+                               section.descriptor.start,
+                               section.descriptor.end))
+        return result
+
+    def _initialize_sections_mapped(self) -> bool:
+        """
+        Locate section headers by scanning a memory map of the base
+        file instead of decoding it line by line.
+
+        Returns False, without doing anything, if the base file cannot
+        be scanned this way.
+        """
+
+        try:
+            fd = self._file.fileno()
+            encoding = codecs.lookup(self._file.encoding).name
+            errors = self._file.errors or "strict"
+        except (AttributeError, LookupError, OSError, TypeError):
+            return False
+
+        if encoding not in _MAPPABLE_ENCODINGS or not self._file.readable():
+            return False
+
+        self._file.flush()
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return True
+
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            if has_lone_cr(mm):
+                return False
+
+            for name, start, end in scan_headers(mm, encoding, errors):
+                self._add_section(name, start, end, size)
+
+        return True
+
+    def _initialize_sections_in_memory(self) -> bool:
+        """
+        Locate section headers in the content of an `io.StringIO` base
+        with string searches, rather than line by line. Positions in a
+        StringIO are character offsets, so they can be computed from
+        the content directly.
+
+        Returns False, without doing anything, if the base is not a
+        StringIO or its content may have line breaks other than "\\n".
+        """
+
+        if not isinstance(self._file, io.StringIO):
+            return False
+
+        text = self._file.getvalue()
+        if "\r" in text:
+            return False
+
+        for name, start, end in scan_text_headers(text):
+            self._add_section(name, start, end, len(text))
+
+        return True
+
     def _initialize_sections_wrapped(self) -> None:
+        if self._initialize_sections_mapped() \
+           or self._initialize_sections_in_memory():
+            return
+
         current_section: Optional[str] = None
         section_start = 0
         previous_position = 0
 
-        def end_section() -> None:
-            if current_section is not None:
-                descriptor = SubTextIO(self._file,
-                                       start=section_start,
-                                       end=previous_position)
-                section = MultiCSVSection(name=current_section,
-                                          descriptor=descriptor)
-                self._sections.append(section)
+        # Bound to locals because they are used on every line.
+        readline = self._file.readline
+        tell = self._file.tell
+        add_section = self._add_section
+        parse_header = _parse_header
+        is_candidate = is_header_candidate
 
         self._file.seek(0, os.SEEK_END)
-        final_position = self._file.tell()
+        final_position = tell()
         if final_position == 0:
             return
 
         self._file.seek(0)
         while True:
-            line = self._file.readline()
+            line = readline()
             if not line:
                 break
 
-            current_position = self._file.tell()
+            current_position = tell()
             if current_position > final_position:
                 raise BrokenTell("Base file has a broken tell() function.")
 
-            if line.endswith("\n"):
-                line = line[:-1]
-
-            if line:
-                row = next(csv.reader([line]))
-                first = row[0].strip()
-                rest = row[1:]
-
-                if first.startswith("[") and \
-                   first.endswith("]") and \
-                   all(not x for x in rest):
-
-                    end_section()
-                    current_section = first[1:-1]
-                    section_start = current_position
+            # Most lines are data, and are ruled out by a single match.
+            name = parse_header(line) if is_candidate(line) else None
+            if name is not None:
+                if current_section is not None:
+                    add_section(current_section, section_start,
+                                previous_position, final_position)
+                current_section = name
+                section_start = current_position
 
             previous_position = current_position
 
-        end_section()
+        if current_section is not None:
+            add_section(current_section, section_start, previous_position,
+                        final_position)
 
     def _initialize_sections(self) -> None:
         initial_file_pos = self._file.tell()
+        _advise(self._file, "POSIX_FADV_SEQUENTIAL")
         try:
             self._initialize_sections_wrapped()
         finally:
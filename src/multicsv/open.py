@@ -1,21 +1,130 @@
 
-from typing import Union, Literal, TextIO
+from typing import Union, Literal, TextIO, Optional, List, Tuple
 from pathlib import Path
+import os
+import tempfile
 
 from .file import MultiCSVFile
 
 
 OpenPath = Union[str, int, bytes, Path]
 
+_SIDECAR_SUFFIX = ".mcsvidx"
+
+
+def _sidecar_path(path: Union[str, bytes, Path]) -> str:
+    return os.fsdecode(path) + _SIDECAR_SUFFIX
+
+
+def _stat_line(st: os.stat_result) -> str:
+    return f"size={st.st_size} mtime_ns={st.st_mtime_ns}\n"
+
+
+def _load_sidecar(path: Union[str, bytes, Path], file: TextIO) \
+        -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Return the section extents recorded next to `path`, or None if
+    there is no index or it was written for a different version of
+    the file.
+    """
+
+    try:
+        with open(_sidecar_path(path), "r", encoding="utf-8") as index:
+            if index.readline() != _stat_line(os.fstat(file.fileno())):
+                return None
+
+            result = []
+            for line in index:
+                name, start, end = line.rstrip("\n").rsplit("\t", 2)
+                result.append((name, int(start), int(end)))
+            return result
+
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(path: Union[str, bytes, Path],
+                   extents: List[Tuple[str, int, int]],
+                   file: TextIO) -> None:
+    """
+    Record `extents` next to `path`, keyed by the current size and
+    modification time of the open `file`.
+
+    The index is written to a temporary file that then replaces it, so
+    an interrupted write leaves the previous index, never a partial one.
+    """
+
+    sidecar = _sidecar_path(path)
+    try:
+        st = os.fstat(file.fileno())
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(sidecar),
+                                         prefix=os.path.basename(sidecar),
+                                         suffix=".tmp")
+    except OSError:
+        return
+
+    try:
+        with open(fd, "w", encoding="utf-8") as index:
+            index.write(_stat_line(st))
+            for name, start, end in extents:
+                index.write(f"{name}\t{start}\t{end}\n")
+        os.replace(temporary, sidecar)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def _remove_sidecar(path: Union[str, bytes, Path]) -> None:
+    try:
+        os.remove(_sidecar_path(path))
+    except OSError:
+        pass
+
 
 def multicsv_open(path: OpenPath,
                   mode: Literal["r", "w", "a", "x", "r+", "w+", "a+", "x+",
                                 "rt", "wt", "at", "xt", "r+t", "w+t", "a+t",
-                                "x+t"] = "rt") \
+                                "x+t"] = "rt",
+                  sidecar: bool = False) \
                   -> MultiCSVFile:
+    """
+    Open the multi-CSV file at `path`.
+
+    With `sidecar=True`, the offsets of the sections found in the file
+    are cached in `<path>.mcsvidx`, keyed by the file's size and
+    modification time, and updated whenever changes to the sections
+    are written to the file. Reopening a file that has not been changed by
+    anything else since then skips scanning it for section headers.
+    """
 
     file = open(path, mode=mode)
-    return MultiCSVFile(file, own=True)
+    if not sidecar or isinstance(path, int):
+        return MultiCSVFile(file, own=True)
+
+    hint = _load_sidecar(path, file)
+    csv_file = MultiCSVFile(file, own=True, sections_hint=hint)
+    if hint is None:
+        _write_sidecar(path, csv_file._section_extents(), file)
+
+    def refresh_sidecar(extents: Optional[List[Tuple[str, int, int]]]) \
+            -> None:
+        # The index is keyed by the file as it is right after these
+        # extents were written, so anything that changes the file
+        # later makes it stale rather than wrong. Without extents, the
+        # sections written are not the ones a scan would find, so the
+        # index is dropped and rebuilt by the next open.
+        file.flush()
+        if extents is None:
+            _remove_sidecar(path)
+        else:
+            _write_sidecar(path, extents, file)
+
+    # Writing sections changes the file, so the index is rewritten
+    # along with it, rather than rebuilt on the next open.
+    csv_file._on_flush = refresh_sidecar
+    return csv_file
 
 
 def multicsv_wrap(file: TextIO) -> MultiCSVFile:
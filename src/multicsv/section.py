@@ -5,5 +5,7 @@ from typing import TextIO
 
 @dataclass(frozen=True)
 class MultiCSVSection:
+    __slots__ = ("name", "descriptor")
+
     name: str
     descriptor: TextIO
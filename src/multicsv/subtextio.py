@@ -1,12 +1,27 @@
-from typing import TextIO, List, Optional, Type, Iterable
+from typing import TextIO, List, Optional, Type, Iterable, Callable
+import codecs
 import io
 import os
+import shutil
+import tempfile
+import weakref
 from .exceptions import OpOnClosedError, \
     InvalidWhenceError, InvalidSubtextCoordinates, \
     BaseMustBeReadable, BaseMustBeSeekable, \
     EndsBeyondBaseContent, BaseIOClosed
 
 
+# Number of characters moved at a time when shifting the base content
+# that follows a resized section.
+_CHUNK_SIZE = 1 << 16
+
+# Tails longer than this are spooled to disk while a section grows.
+_SPOOL_SIZE = 1 << 20
+
+# Encodings that write each ASCII character as a single byte.
+_ASCII_COMPATIBLE = ("utf-8", "ascii", "iso8859-1", "iso8859-15", "cp1252")
+
+
 class SubTextIO(TextIO):
     """
     SubTextIO provides an interface for reading, writing, and
@@ -25,8 +40,10 @@ class SubTextIO(TextIO):
 
     Structure:
     ----------
-    - The class initializes by reading and storing the relevant
-      segment of the base TextIO into an in-memory buffer.
+    - The relevant segment of the base TextIO is read into memory
+      the first time it is accessed. It is held as a `str` until it
+      is modified, and in an `io.StringIO` buffer from then until the
+      next flush.
     - Operations (read, write, seek, etc.) are done on this buffer.
     - Changes are committed back to the base TextIO when the `flush`
       or `close` method is called.
@@ -50,6 +67,7 @@ class SubTextIO(TextIO):
     - `write(s: str) -> int`: Writes a string to the buffer.
     - `writelines(lines: List[str]) -> None`: Writes a list of lines
       to the buffer.
+    - `getvalue() -> str`: Returns the entire content of the buffer.
     - `truncate(size: int) -> int`: Resizes the section.
     - `seek(offset: int, whence: int = 0) -> int`: Moves the buffer's
       current position.
@@ -100,17 +118,32 @@ class SubTextIO(TextIO):
       of buffer size when working with very large files.
     - Always ensure to call `flush` or use context management to
       commit changes back to the base TextIO.
+    - Flushing a SubTextIO that is a section of a MultiCSVFile flushes
+      the whole MultiCSVFile.
     """
 
-    def __init__(self, base_io: TextIO, start: int, end: int):
+    # A MultiCSVFile holds one SubTextIO per section, and the typing.IO
+    # bases declare no instance attributes, so instances need no dict.
+    __slots__ = ("_initialized", "_need_flush", "_base_io", "_start",
+                 "_end", "_closed", "_text", "_position", "_buffer",
+                 "_length", "_loaded", "_owner_flush", "is_at_end")
+
+    def __init__(self, base_io: TextIO, start: int, end: int,
+                 base_length: Optional[int] = None):
         self._initialized = False
         self._need_flush = False
         self._base_io = base_io
         self._start = start
         self._end = end
-        self._position = 0  # Position within the SubTextIO
         self._closed = base_io.closed
-        self._buffer = ""
+        self._text = ""
+        self._position = 0  # Position within `_text`
+        self._buffer: Optional[io.StringIO] = None
+        self._length = 0
+        self._loaded = False
+        # Set by a MultiCSVFile that this view is a section of.
+        self._owner_flush: \
+            Optional[weakref.WeakMethod[Callable[[], None]]] = None
 
         if end < start or start < 0:
             raise InvalidSubtextCoordinates(
@@ -125,40 +158,128 @@ class SubTextIO(TextIO):
             raise BaseMustBeReadable("Base io must be readable"
                                      " if existing content is to be modified.")
 
-        self._load()
-        self._initial_length = self.buffer_length
+        self._check_extent(base_length)
         self._initialized = True
 
-    def _load(self) -> None:
+    def _check_extent(self, base_length: Optional[int]) -> None:
         """
-        Load the relevant part of the base_io into the buffer.
+        Verify that the section lies within the base_io and find out
+        whether it extends to the end of it. The end position of the
+        base_io is only looked up if the caller did not pass it in.
         """
 
-        base_initial_position = self._base_io.tell()
+        if base_length is None:
+            base_initial_position = self._base_io.tell()
+            try:
+                self._base_io.seek(0, os.SEEK_END)
+                base_length = self._base_io.tell()
+            finally:
+                self._base_io.seek(base_initial_position)
 
-        #
-        # Below we try to avoid calling `base_io.read()` as much as possible.
-        #
-        try:
-            self._base_io.seek(0, os.SEEK_END)
-            base_last_position = self._base_io.tell()
+        if self.end > base_length:
+            raise EndsBeyondBaseContent(
+                "End position is greater than base TextIO length.")
 
-            if self.end > base_last_position:
-                raise EndsBeyondBaseContent(
-                    "End position is greater than base TextIO length.")
+        self.is_at_end = self.end == base_length
 
-            if self.end > self.start:
-                self._base_io.seek(self.end)
-                base_final_position = self._base_io.tell()
-                self.is_at_end = base_final_position == base_last_position
-                self._base_io.seek(self.start)
-                self._buffer = self._base_io.read(self.end - self.start)
-            else:
-                base_final_position = self.start
-                self._base_io.seek(0, os.SEEK_END)
-                self.is_at_end = base_final_position == self._base_io.tell()
-        finally:
-            self._base_io.seek(base_initial_position)
+    def _ensure_loaded(self) -> None:
+        """
+        Load the relevant part of the base_io into the buffer. This is
+        deferred until the content is first needed, so that sections
+        which are never accessed are never read.
+        """
+
+        if self._loaded:
+            return
+
+        if self.end > self.start:
+            base_initial_position = self._base_io.tell()
+            try:
+                content = self._read_extent()
+            finally:
+                self._base_io.seek(base_initial_position)
+
+            self._text = content
+            self._length = len(content)
+
+        self._loaded = True
+
+    def _read_extent(self) -> str:
+        """
+        Read the section's content from the base io. Its extent is
+        measured in `tell()` positions, which for files count bytes
+        rather than characters, so reading `end - start` characters
+        may run past the end: non-ASCII characters take several bytes,
+        and "\\r\\n" may be read as a single "\\n".
+        """
+
+        base = self._base_io
+        base.seek(self.start)
+        content = base.read(self.end - self.start)
+        if base.tell() <= self.end:
+            return content
+
+        # No character takes more than four bytes in the encodings
+        # that are in use, so these reads mostly stay within the end.
+        parts = []
+        position = self.start
+        base.seek(position)
+        while position < self.end:
+            size = max(1, (self.end - position) // 4)
+            chunk = base.read(size)
+            if not chunk:
+                break
+
+            new_position = base.tell()
+            if new_position > self.end:
+                if size == 1:
+                    break
+                base.seek(position)
+                chunk = base.read(1)
+                new_position = base.tell()
+                if new_position > self.end:
+                    break
+
+            parts.append(chunk)
+            position = new_position
+
+        return ''.join(parts)
+
+    def _skip_load(self) -> None:
+        """
+        Treat the content as loaded, and empty, without reading it
+        from the base io. Only valid before the first load, when the
+        position is 0, and if none of the old content would survive
+        the modification that is about to be made.
+        """
+
+        self._loaded = True
+
+    def _editor(self) -> io.StringIO:
+        """
+        Return the buffer in which modifications are made. The loaded
+        content is copied into an `io.StringIO` on the first
+        modification only: StringIO stores four bytes per character,
+        while an unmodified section is kept as a compact `str`.
+        """
+
+        self._ensure_loaded()
+        if self._buffer is None:
+            self._buffer = io.StringIO(self._text)
+            self._buffer.seek(self._position)
+            self._text = ""
+        return self._buffer
+
+    def _settle(self) -> None:
+        """
+        Turn the modified buffer back into a `str` once its content
+        has been written to the base io.
+        """
+
+        if self._buffer is not None:
+            self._text = self._buffer.getvalue()
+            self._position = self._buffer.tell()
+            self._buffer = None
 
     @property
     def start(self) -> int:
@@ -168,9 +289,22 @@ class SubTextIO(TextIO):
     def end(self) -> int:
         return self._end
 
+    @property
+    def base_io(self) -> TextIO:
+        return self._base_io
+
+    @property
+    def modified(self) -> bool:
+        """
+        Whether the buffer has changes not yet written to the base io.
+        """
+
+        return self._need_flush
+
     @property
     def buffer_length(self) -> int:
-        return len(self._buffer)
+        self._ensure_loaded()
+        return self._length
 
     @property
     def mode(self) -> str:
@@ -185,29 +319,44 @@ class SubTextIO(TextIO):
         return self._base_io.encoding
 
     def read(self, size: int = -1) -> str:
-        self._check_closed()
+        if self._closed:
+            raise OpOnClosedError("I/O operation on closed file.")
+        if not self._loaded:
+            self._ensure_loaded()
 
-        if size < 0 or size > self.buffer_length - self._position:
-            size = self.buffer_length - self._position
+        if self._buffer is not None:
+            return self._buffer.read(size)
+
+        start = self._position
+        if size < 0:
+            # Slicing from 0 gives back the text itself, without a copy.
+            result = self._text[start:]
+        else:
+            result = self._text[start:start + size]
 
-        result = self._buffer[self._position:self._position + size]
         self._position += len(result)
         return result
 
     def readline(self, limit: int = -1) -> str:
-        self._check_closed()
+        if self._closed:
+            raise OpOnClosedError("I/O operation on closed file.")
+        if not self._loaded:
+            self._ensure_loaded()
 
-        if self._position >= self.buffer_length:
-            return ''
+        if self._buffer is not None:
+            return self._buffer.readline(limit)
 
-        newline_pos = self._buffer.find('\n', self._position)
-        if newline_pos == -1 or newline_pos >= self.buffer_length:
-            newline_pos = self.buffer_length
+        start = self._position
+        if limit < 0 or limit > self._length - start:
+            end = self._length
+        else:
+            end = start + limit
 
-        if limit < 0 or limit > newline_pos - self._position:
-            limit = newline_pos - self._position + 1
+        newline_pos = self._text.find('\n', start, end)
+        if newline_pos >= 0:
+            end = newline_pos + 1
 
-        result = self._buffer[self._position:self._position + limit]
+        result = self._text[start:end]
         self._position += len(result)
         return result
 
@@ -223,46 +372,93 @@ class SubTextIO(TextIO):
 
         self._check_closed()
 
-        remaining_buffer = self._buffer[self._position:]
-        lines = remaining_buffer.splitlines(keepends=True)
+        if hint < 0:
+            return self._readlines_all()
+
         read_size = 0
         result = []
 
-        for line in lines:
+        for line in iter(self.readline, ''):
             result.append(line)
             read_size += len(line)
             if 0 <= hint <= read_size:
                 break
 
-        self._position += read_size
         return result
 
-    def write(self, s: str) -> int:
-        self._check_closed()
+    def _readlines_all(self) -> List[str]:
+        self._ensure_loaded()
+
+        if self._buffer is not None:
+            return self._buffer.readlines()
 
-        pre = self._buffer[:self._position]
-        post = self._buffer[self._position + len(s):]
-        written = len(s)
+        rest = self._text[self._position:self._length]
+        self._position = self._length
+        if not rest:
+            return []
 
-        self._buffer = pre + s + post
-        self._position += written
+        lines = rest.split('\n')
+        last = lines.pop()
+        result = [line + '\n' for line in lines]
+        if last:
+            result.append(last)
+        return result
+
+    def write(self, s: str) -> int:
+        if self._closed:
+            raise OpOnClosedError("I/O operation on closed file.")
+        if not self._loaded and len(s) >= self.end - self.start:
+            # The extent counts at least as many positions as there
+            # are characters in it, so all of them get overwritten.
+            self._skip_load()
+        buffer = self._editor()
+
+        if buffer.tell() > self._length:
+            # Position was left past the end by `truncate`.
+            buffer.seek(self._length)
+
+        written = buffer.write(s)
+        self._length = max(self._length, buffer.tell())
         self._need_flush = True
 
         return written
 
+    def getvalue(self) -> str:
+        self._check_closed()
+        return self._content()
+
+    def _content(self) -> str:
+        """
+        Return the entire content of the section, also after this view
+        has been closed, so that its owner can still write it out.
+        """
+
+        self._ensure_loaded()
+
+        if self._buffer is not None:
+            return self._buffer.getvalue()
+        return self._text
+
     def writelines(self, lines: Iterable[str]) -> None:
-        for line in lines:
-            self.write(line)
+        # One write of the joined lines rather than one write per line.
+        data = ''.join(lines)
+        if data:
+            self.write(data)
 
     def truncate(self, size: Optional[int] = None) -> int:
         self._check_closed()
+        if not self._loaded and not size:
+            # Before loading, the position is 0.
+            self._skip_load()
+        buffer = self._editor()
 
         if size is None:
-            end = self._position
+            end = buffer.tell()
         else:
             end = size
 
-        self._buffer = self._buffer[:end]
+        buffer.truncate(end)
+        self._length = min(self._length, end)
         self._need_flush = True
         return self.buffer_length
 
@@ -274,23 +470,43 @@ class SubTextIO(TextIO):
                 self._closed = True
 
     def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
-        self._check_closed()
+        if self._closed:
+            raise OpOnClosedError("I/O operation on closed file.")
 
         if whence == os.SEEK_SET:  # Absolute positioning
             target = offset
         elif whence == os.SEEK_CUR:  # Relative to current position
-            target = self._position + offset
+            if self._buffer is not None:
+                target = self._buffer.tell() + offset
+            else:
+                target = self._position + offset
         elif whence == os.SEEK_END:  # Relative to the end
-            target = self.buffer_length + offset
+            self._ensure_loaded()
+            target = self._length + offset
         else:
             raise InvalidWhenceError(
                 f"Invalid value for whence: {repr(whence)}")
 
-        self._position = max(0, min(target, self.buffer_length))
-        return self._position
+        if target > 0:
+            # Rewinding does not need the content to be loaded.
+            self._ensure_loaded()
+            if target > self._length:
+                target = self._length
+        else:
+            target = 0
+
+        if self._buffer is not None:
+            return self._buffer.seek(target)
+
+        self._position = target
+        return target
 
     def tell(self) -> int:
-        self._check_closed()
+        if self._closed:
+            raise OpOnClosedError("I/O operation on closed file.")
+
+        if self._buffer is not None:
+            return self._buffer.tell()
         return self._position
 
     def flush(self) -> None:
@@ -301,24 +517,199 @@ class SubTextIO(TextIO):
             return
 
         if not self._closed:
+            owner_flush = None
+            if self._owner_flush is not None:
+                owner_flush = self._owner_flush()
+            if owner_flush is not None:
+                # Resizing the section would move the sections after
+                # it, so the owner writes them all out instead.
+                owner_flush()
+                return
+
             base_initial_position = self._base_io.tell()
             try:
-                if self.buffer_length == self._initial_length \
-                   or self.is_at_end:
-                    self._base_io.seek(self.start)
-                    self._base_io.write(self._buffer)
-                else:
-                    self._base_io.seek(self.end)
-                    content_after = self._base_io.read()
-
-                    self._base_io.seek(self.start)
-                    self._base_io.write(self._buffer + content_after)
-
+                self._write_to_base()
                 self._base_io.flush()
                 self._need_flush = False
             finally:
                 self._base_io.seek(base_initial_position)
 
+    def _write_to_base(self) -> None:
+        """
+        Write the buffer over the section's extent in the base io and
+        move whatever follows the section so that it directly follows
+        the new content. The tail is moved in bounded chunks instead
+        of being read into memory as a whole.
+        """
+
+        content = self.getvalue()
+
+        if self.is_at_end:
+            self._base_io.seek(self.start)
+            self._base_io.write(content)
+            new_end = self._base_io.tell()
+            if new_end < self.end:
+                self._base_io.truncate()
+
+        else:
+            wide = self._wide_line_breaks()
+            if self._fits(content, wide):
+                self._base_io.seek(self.start)
+                self._base_io.write(content)
+                new_end = self._base_io.tell()
+                if new_end < self.end:
+                    self._move_tail_forward(self.end, new_end, wide)
+            else:
+                new_end = self._spool_tail(self.end, self.start, content)
+
+        self._end = new_end
+        self._settle()
+
+    def _measurable(self) -> bool:
+        """
+        Whether the length of ASCII text is the number of positions it
+        takes in the base io. Offsets in an `io.StringIO` count
+        characters, while in files they count bytes, so there only an
+        encoding that writes ASCII one byte per character qualifies.
+        """
+
+        if isinstance(self._base_io, io.StringIO):
+            return True
+
+        try:
+            encoding = codecs.lookup(self._base_io.encoding).name
+        except (LookupError, TypeError):
+            return False
+
+        return encoding in _ASCII_COMPATIBLE
+
+    def _wide_line_breaks(self) -> bool:
+        """
+        Whether a "\n" written to the base io takes more than one
+        position there, as when it is translated to "\r\n". This is
+        found out by writing one at the start of the section, which is
+        about to be overwritten anyway. If that cannot be done safely,
+        line breaks are assumed to be wide.
+        """
+
+        if self.end - self.start < 2 or not self._measurable():
+            return True
+
+        self._base_io.seek(self.start)
+        self._base_io.write("\n")
+        return self._base_io.tell() - self.start > 1
+
+    def _fits(self, content: str, wide: bool) -> bool:
+        """
+        Whether writing `content` at the start of the section is sure
+        not to reach past its current end in the base io. If line
+        breaks are `wide`, they count twice.
+        """
+
+        length = len(content)
+        if wide:
+            length += content.count("\n")
+
+        return length <= self.end - self.start \
+            and self._measurable() and content.isascii()
+
+    def _relocate(self, start: int, end: int, is_at_end: bool) -> None:
+        """
+        Point this view at the extent [start, end) of the base io,
+        which its owner has just filled with the buffer's content.
+        """
+
+        self._start = start
+        self._end = end
+        self.is_at_end = is_at_end
+        self._need_flush = False
+        self._settle()
+
+    def _detach(self) -> None:
+        """
+        Move this view onto an in-memory copy of its content, for a
+        view whose section its owner no longer writes out. It keeps
+        reading what it held, and writing to it no longer reaches the
+        base io.
+        """
+
+        content = self._content()
+        self._base_io = io.StringIO(content)
+        self._start = 0
+        self._end = len(content)
+        self.is_at_end = True
+        self._owner_flush = None
+
+    def _move_tail_forward(self, source: int, destination: int,
+                           expands: bool) -> None:
+        """
+        Move everything from `source` to the end of the base io
+        back to `destination`, then cut the base io off after it.
+        If line breaks may be `expands`ed on the way, a chunk is only
+        moved if it cannot overrun the part of the tail not yet read;
+        otherwise the rest of the tail is spooled.
+        """
+
+        while True:
+            self._base_io.seek(source)
+            chunk = self._base_io.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            if expands and chunk.count("\n") > source - destination:
+                self._spool_tail(source, destination)
+                return
+
+            source = self._base_io.tell()
+            self._base_io.seek(destination)
+            self._base_io.write(chunk)
+            destination = self._base_io.tell()
+
+        self._base_io.seek(destination)
+        self._base_io.truncate()
+
+    def _spool_tail(self, source: int, destination: int,
+                    content: str = "") -> int:
+        """
+        Write `content` at `destination` in the base io, followed by
+        everything from `source` to the end of the base io, and cut
+        the base io off after it. Returns the position after `content`.
+        """
+
+        if isinstance(self._base_io, io.StringIO):
+            # The base is in memory already, so the tail can be held
+            # as a string.
+            self._base_io.seek(source)
+            rest = self._base_io.read()
+            self._base_io.seek(destination)
+            self._base_io.write(content)
+            content_end = self._base_io.tell()
+            self._base_io.write(rest)
+            self._base_io.truncate()
+            return content_end
+
+        # Copying the tail backwards in place would need character
+        # offsets that text-mode streams do not provide, so the
+        # tail is spooled through a temporary file instead. Lone
+        # surrogates, as decoded with errors="surrogateescape", are
+        # passed through unchanged.
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE,
+                                           mode="w+",
+                                           encoding="utf-8",
+                                           errors="surrogatepass",
+                                           newline="") as tail:
+            self._base_io.seek(source)
+            shutil.copyfileobj(self._base_io, tail, _CHUNK_SIZE)
+            tail.seek(0)
+
+            self._base_io.seek(destination)
+            self._base_io.write(content)
+            content_end = self._base_io.tell()
+            shutil.copyfileobj(tail, self._base_io, _CHUNK_SIZE)
+            self._base_io.truncate()
+
+        return content_end
+
     def isatty(self) -> bool:
         return False
 
@@ -336,7 +727,9 @@ class SubTextIO(TextIO):
 
     def _check_closed(self) -> None:
         """
-        Helper method to verify if the IO object is closed.
+        Helper method to verify if the IO object is closed. The
+        methods called once per line or per row, such as `read`,
+        `readline` and `__next__`, do this check inline instead.
         """
 
         if self._closed:
@@ -346,8 +739,23 @@ class SubTextIO(TextIO):
         return self
 
     def __next__(self) -> str:
-        if self._position < self.buffer_length:
-            return self.readline()
+        # This is `readline()` without a limit, written out because it
+        # runs once per line when a section is iterated over.
+        if self._closed:
+            raise OpOnClosedError("I/O operation on closed file.")
+        if not self._loaded:
+            self._ensure_loaded()
+
+        if self._buffer is not None:
+            line = self._buffer.readline()
+        else:
+            start = self._position
+            end = self._text.find('\n', start) + 1
+            line = self._text[start:end] if end else self._text[start:]
+            self._position += len(line)
+
+        if line:
+            return line
         else:
             raise StopIteration
 
@@ -5,7 +5,8 @@ from pathlib import Path
 from typing import TextIO
 from multicsv.file import MultiCSVFile
 from multicsv.exceptions import SectionNotFound, CSVFileBaseIOClosed, \
-    OpOnClosedCSVFileError, BrokenTell
+    OpOnClosedCSVFileError, BrokenTell, EndsBeyondBaseContent, \
+    InvalidSubtextCoordinates
 
 
 @pytest.fixture
@@ -269,3 +270,261 @@ def test_broken_tell(tmp_path: Path) -> None:
 
     with pytest.raises(BrokenTell):
         MultiCSVFile(temp_file.open())
+
+
+def test_access_after_deleting_earlier_section():
+    content = "[a]\n1\n[b]\n2\n[c]\n3\n"
+    csv_file = MultiCSVFile(io.StringIO(content))
+    del csv_file["a"]
+
+    assert list(csv_file) == ["b", "c"]
+    assert csv_file["b"].read() == "2\n"
+    assert csv_file["c"].read() == "3\n"
+
+    csv_file["c"] = io.StringIO("33\n")
+    assert list(csv_file) == ["b", "c"]
+    assert csv_file["c"].read() == "33\n"
+
+
+def test_duplicate_section_names():
+    base = io.StringIO("[a]\n1\n[b]\n2\n[a]\n3\n")
+    csv_file = MultiCSVFile(base)
+
+    assert len(csv_file) == 3
+    assert list(csv_file) == ["a", "b", "a"]
+    assert csv_file["a"].read() == "1\n"
+
+    del csv_file["a"]
+    assert len(csv_file) == 2
+    assert list(csv_file) == ["b", "a"]
+    assert "a" in csv_file
+    assert csv_file["a"].read() == "3\n"
+
+    del csv_file["a"]
+    assert "a" not in csv_file
+    csv_file.flush()
+    assert base.getvalue() == "[b]\n2\n"
+
+
+@pytest.mark.parametrize("initial_content", [
+    "[section1]\na,b,c\n1,2,3\n[section2]\nd,e,f\n4,5,6\n",
+    "preamble\n[section1],,\na,b,c\n[section2]",
+    "[section1]\n[section2]\n\n[section3]\nx\n",
+    "a,[b]\n[not a header],x\n[section1]\n1\n",
+])
+def test_file_and_stringio_sections_agree(tmp_path: Path, initial_content):
+    path = tmp_path / "file1.csv"
+    path.write_text(initial_content)
+
+    expected = MultiCSVFile(io.StringIO(initial_content))
+    with path.open("r") as fd:
+        actual = MultiCSVFile(fd)
+        assert list(actual) == list(expected)
+        for name in expected:
+            assert actual[name].read() == expected[name].read()
+
+
+def test_repeated_access_rewinds(simple_csv):
+    csv_file = MultiCSVFile(simple_csv)
+    assert csv_file["section1"].readline() == "a,b,c\n"
+    assert csv_file["section1"].read() == "a,b,c\n1,2,3\n"
+    csv_file.section("section1").seek(3)
+    assert csv_file.section("section1").read() == "a,b,c\n1,2,3\n"
+
+
+def test_sections_hint(simple_csv):
+    csv_file = MultiCSVFile(simple_csv,
+                            sections_hint=[("section2", 34, 46)])
+    assert list(csv_file) == ["section2"]
+    assert csv_file["section2"].read() == "d,e,f\n4,5,6\n"
+
+
+@pytest.mark.parametrize("hint, error", [
+    (("section1", 11, 100), EndsBeyondBaseContent),
+    (("section1", 23, 11), InvalidSubtextCoordinates),
+])
+def test_invalid_sections_hint(simple_csv, hint, error):
+    with pytest.raises(error):
+        MultiCSVFile(simple_csv, sections_hint=[hint])
+
+
+def test_replace_and_delete_unaccessed_sections(simple_csv):
+    csv_file = MultiCSVFile(simple_csv)
+    csv_file["section2"] = io.StringIO("x\n")
+    del csv_file["section1"]
+    csv_file.flush()
+
+    simple_csv.seek(0)
+    assert simple_csv.read() == "[section2]\nx\n"
+
+
+def test_stringio_with_crlf_lines():
+    content = io.StringIO("[section1]\r\na,b\r\n[section2]\r\nc\r\n",
+                          newline="")
+    csv_file = MultiCSVFile(content)
+    assert list(csv_file) == ["section1", "section2"]
+    assert csv_file["section1"].read() == "a,b\r\n"
+    assert csv_file["section2"].read() == "c\r\n"
+
+
+def test_flush_writes_modified_section(simple_csv):
+    csv_file = MultiCSVFile(simple_csv)
+    csv_file["section1"].write("x,y,z\n7,8,9\n0,0,0\n")
+
+    csv_file.flush()
+    simple_csv.seek(0)
+    assert simple_csv.read() == \
+        "[section1]\nx,y,z\n7,8,9\n0,0,0\n[section2]\nd,e,f\n4,5,6\n"
+
+
+def test_modified_sections_stay_consistent_after_flush(simple_csv):
+    csv_file = MultiCSVFile(simple_csv)
+    csv_file["section1"].write("longer,first,row\n")
+    csv_file["section3"] = io.StringIO("g,h,i\n")
+    csv_file.flush()
+
+    section2 = csv_file["section2"]
+    section2.write("D,E,F\n")
+    section2.flush()
+    csv_file.close()
+
+    simple_csv.seek(0)
+    assert simple_csv.read() == \
+        "[section1]\nlonger,first,row\n[section2]\nD,E,F\n4,5,6\n" \
+        "[section3]\ng,h,i\n"
+
+
+@pytest.mark.parametrize("header_line, expected_sections", [
+    ("[section1]", ["section1"]),
+    ("[section1],,,", ["section1"]),
+    ("[section1] ,, ", []),
+    ("[section1] ,,", ["section1"]),
+    ("[]", [""]),
+    ("[section1],x", []),
+    (" [section1]", ["section1"]),
+    ('"[section1]"', ["section1"]),
+    ('[section1],""', ["section1"]),
+    ('"[a,b]"', ["a,b"]),
+    ("[a]b]", ["a]b"]),
+    ("[a,b]", []),
+    ("section1]", []),
+    (' "[section1]"', []),
+])
+def test_header_lines(header_line, expected_sections):
+    csv_file = MultiCSVFile(io.StringIO(f"{header_line}\na,b,c\n"))
+    assert list(csv_file) == expected_sections
+
+
+def test_flush_keeps_sections_never_accessed(tmp_path: Path):
+    content = "".join(f"[section{i}]\na,b\n{i},{i}\n" for i in range(50))
+    path = tmp_path / "file1.csv"
+    path.write_text(content)
+
+    with path.open("r+") as fd:
+        with MultiCSVFile(fd) as csv_file:
+            csv_file["section7"].write("x,y,z\n")
+
+    assert path.read_text() == content.replace(
+        "[section7]\na,b\n7,7\n", "[section7]\nx,y,z\n7\n")
+
+
+def test_preload(simple_csv):
+    csv_file = MultiCSVFile(simple_csv)
+    csv_file.preload()
+
+    simple_csv.seek(0)
+    simple_csv.write("X" * 40)
+    assert csv_file["section1"].read() == "a,b,c\n1,2,3\n"
+    assert csv_file["section2"].read() == "d,e,f\n4,5,6\n"
+
+
+def test_preload_on_closed(simple_csv):
+    csv_file = MultiCSVFile(simple_csv)
+    csv_file.close()
+
+    with pytest.raises(OpOnClosedCSVFileError):
+        csv_file.preload()
+
+
+def test_section_flush_keeps_other_sections_in_place():
+    base = io.StringIO("[s1]\na,b\n[s2]\nc,d\n[s3]\ne,f\n")
+    csv_file = MultiCSVFile(base)
+    s1 = csv_file["s1"]
+    s1.write("a much longer line here\n")
+    s1.flush()
+
+    assert base.getvalue() == \
+        "[s1]\na much longer line here\n[s2]\nc,d\n[s3]\ne,f\n"
+    assert csv_file["s2"].read() == "c,d\n"
+
+    s3 = csv_file["s3"]
+    s3.write("E,F\n")
+    s3.flush()
+    csv_file["s4"] = io.StringIO("g\n")
+    csv_file.close()
+
+    assert base.getvalue() == \
+        "[s1]\na much longer line here\n[s2]\nc,d\n[s3]\nE,F\n[s4]\ng\n"
+
+
+def test_section_flush_in_crlf_file(tmp_path: Path):
+    path = tmp_path / "file1.csv"
+    path.write_bytes(b"[s1]\r\na\r\n[s2]\r\nb,c\r\n[s3]\r\nd\r\n")
+
+    with path.open("r+") as fd:
+        with MultiCSVFile(fd) as csv_file:
+            s1 = csv_file["s1"]
+            s1.write("x\ny\n")
+            s1.flush()
+            assert csv_file["s2"].read() == "b,c\n"
+            s3 = csv_file["s3"]
+            s3.write("z\n")
+            s3.flush()
+
+    with path.open("r") as fd:
+        assert fd.read() == "[s1]\nx\ny\n[s2]\nb,c\n[s3]\nz\n"
+
+
+def test_flush_after_closing_a_section():
+    base = io.StringIO("[a]\n1,2\n[b]\n3,4\n")
+    csv_file = MultiCSVFile(base)
+    with csv_file["a"] as a:
+        assert a.read() == "1,2\n"
+
+    csv_file["b"].write("9")
+    csv_file.flush()
+
+    assert base.getvalue() == "[a]\n1,2\n[b]\n9,4\n"
+
+
+def test_failed_flush_leaves_base_intact():
+    base = io.StringIO("[a]\n1,2\n[b]\n3,4\n")
+    csv_file = MultiCSVFile(base)
+    replacement = io.StringIO("x\n")
+    csv_file["c"] = replacement
+    replacement.close()
+
+    with pytest.raises(ValueError):
+        csv_file.flush()
+
+    assert base.getvalue() == "[a]\n1,2\n[b]\n3,4\n"
+    del csv_file["c"]
+
+
+def test_replaced_and_deleted_sections_keep_their_content():
+    base = io.StringIO("[a]\nalpha\n[b]\nbeta\n[c]\ngamma\n")
+    csv_file = MultiCSVFile(base)
+    old_a = csv_file["a"]
+    old_b = csv_file["b"]
+    csv_file["a"] = io.StringIO("new\n")
+    del csv_file["b"]
+    csv_file.flush()
+
+    assert old_a.read() == "alpha\n"
+    assert old_b.read() == "beta\n"
+
+    old_a.write("ignored\n")
+    old_a.flush()
+    csv_file.close()
+
+    assert base.getvalue() == "[a]\nnew\n[c]\ngamma\n"
@@ -1,6 +1,7 @@
 
 import pytest
 import io
+import os
 from multicsv.open import multicsv_open
 
 simple_csv_content = """\
@@ -84,3 +85,172 @@ a,b,c
     with open(path, "r") as file:
         expected_content = initial_content + "[section2]\nd,e,f\n4,5,6\n"
         assert file.read() == expected_content
+
+
+@pytest.mark.parametrize("newline, first, second", [
+    ("\n", "ab\n", "cd\n"),
+    ("\r\n", "ab\n", "cd\n"),
+    ("\n", "éé,ü\n", "ß\n"),
+    ("\r\n", "é\n" * 1000, "x\n"),
+])
+def test_open_read_multibyte_positions(tmp_path, newline, first, second):
+    path = tmp_path / "file1.csv"
+    with open(path, "w", encoding="utf-8", newline=newline) as writer:
+        writer.write(f"[a]\n{first}[b]\n{second}")
+
+    with multicsv_open(path) as csv_file:
+        assert csv_file["a"].read() == first
+        assert csv_file["b"].read() == second
+
+
+def test_open_read_section_after_closing(tmp_path):
+    path = tmp_path / "file10.txt"
+    path.write_text(simple_csv_content)
+
+    with multicsv_open(path) as csv_file:
+        section2 = csv_file["section2"]
+
+    assert section2.read() == "d,e,f\n4,5,6\n"
+
+
+def test_open_modify_existing_section(tmp_path):
+    path = tmp_path / "file4.txt"
+    path.write_text(simple_csv_content)
+
+    with multicsv_open(path, "r+") as csv_file:
+        csv_file["section1"].write("x,y,z\n7,8,9\n0,0,0\n")
+
+    with open(path, "r") as file:
+        assert file.read() == \
+            "[section1]\nx,y,z\n7,8,9\n0,0,0\n[section2]\nd,e,f\n4,5,6\n"
+
+
+def test_open_with_sidecar(tmp_path):
+    path = tmp_path / "file5.txt"
+    path.write_text(simple_csv_content)
+    sidecar = tmp_path / "file5.txt.mcsvidx"
+
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert list(csv_file) == ['section1', 'section2']
+
+    assert sidecar.read_text().splitlines()[1:] == \
+        ["section1\t11\t23", "section2\t34\t46"]
+
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert list(csv_file) == ['section1', 'section2']
+        assert csv_file["section2"].read() == "d,e,f\n4,5,6\n"
+
+
+def test_open_with_sidecar_after_writing(tmp_path):
+    path = tmp_path / "file8.txt"
+    path.write_text(simple_csv_content)
+    sidecar = tmp_path / "file8.txt.mcsvidx"
+
+    with multicsv_open(path, mode="r+", sidecar=True) as csv_file:
+        section1 = csv_file["section1"]
+        section1.write("x\n")
+        section1.truncate()
+        csv_file["section3"] = io.StringIO("g,h,i\n")
+
+    stat = os.stat(path)
+    assert sidecar.read_text().splitlines() == [
+        f"size={stat.st_size} mtime_ns={stat.st_mtime_ns}",
+        "section1\t11\t13",
+        "section2\t24\t36",
+        "section3\t47\t53",
+    ]
+
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert list(csv_file) == ['section1', 'section2', 'section3']
+        assert csv_file["section3"].read() == "g,h,i\n"
+
+
+def test_open_with_sidecar_after_section_flush(tmp_path):
+    path = tmp_path / "file9.txt"
+    path.write_text("[s1]\na,b\n[s2]\nc,d\n")
+
+    with multicsv_open(path, mode="r+", sidecar=True) as csv_file:
+        csv_file["s3"] = io.StringIO("e,f\n")
+        csv_file.flush()
+        s1 = csv_file["s1"]
+        s1.write("a much longer line here\n")
+        s1.flush()
+
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert {name: csv_file[name].read() for name in csv_file} == {
+            "s1": "a much longer line here\n",
+            "s2": "c,d\n",
+            "s3": "e,f\n",
+        }
+
+
+def test_open_with_interrupted_sidecar_write(tmp_path, monkeypatch):
+    path = tmp_path / "file11.txt"
+    path.write_text(simple_csv_content)
+    sidecar = tmp_path / "file11.txt.mcsvidx"
+
+    with multicsv_open(path, sidecar=True):
+        pass
+    previous = sidecar.read_text()
+
+    def fail_replace(src, dst):
+        raise OSError("interrupted")
+
+    monkeypatch.setattr(os, "replace", fail_replace)
+    with multicsv_open(path, mode="r+", sidecar=True) as csv_file:
+        csv_file["section3"] = io.StringIO("g,h,i\n")
+
+    assert sidecar.read_text() == previous
+    assert sorted(os.listdir(tmp_path)) == ["file11.txt", "file11.txt.mcsvidx"]
+
+    monkeypatch.undo()
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert list(csv_file) == ['section1', 'section2', 'section3']
+
+
+@pytest.mark.parametrize("name, content", [
+    ("b", "x"),
+    ("b", "x\n[d]\ny\n"),
+    ("b", "x\n\"[d]\",,\n"),
+    ("b\nc", "x\n"),
+])
+def test_open_with_sidecar_finds_what_a_scan_finds(tmp_path, name, content):
+    path = tmp_path / "file12.txt"
+    path.write_text("[a]\nalpha\n")
+    sidecar = tmp_path / "file12.txt.mcsvidx"
+
+    with multicsv_open(path, mode="r+", sidecar=True) as csv_file:
+        csv_file[name] = io.StringIO(content)
+        csv_file["c"] = io.StringIO("y\n")
+
+    with multicsv_open(path) as csv_file:
+        scanned = {name: csv_file[name].read() for name in csv_file}
+
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert {name: csv_file[name].read() for name in csv_file} == scanned
+
+    assert sidecar.exists()
+
+
+def test_open_with_stale_sidecar(tmp_path):
+    path = tmp_path / "file6.txt"
+    path.write_text(simple_csv_content)
+
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert list(csv_file) == ['section1', 'section2']
+
+    path.write_text("[other]\nx\n")
+
+    with multicsv_open(path, sidecar=True) as csv_file:
+        assert list(csv_file) == ['other']
+        assert csv_file["other"].read() == "x\n"
+
+
+def test_open_without_sidecar_writes_no_index(tmp_path):
+    path = tmp_path / "file7.txt"
+    path.write_text(simple_csv_content)
+
+    with multicsv_open(path) as csv_file:
+        assert list(csv_file) == ['section1', 'section2']
+
+    assert not (tmp_path / "file7.txt.mcsvidx").exists()
@@ -0,0 +1,90 @@
+
+import pytest
+from multicsv._scanner import scan_headers, scan_text_headers, \
+    parse_header, has_lone_cr
+
+
+def test_scan_headers():
+    content = b"[section1]\na,b,c\n1,2,3\n[section2]\nd,e,f\n4,5,6\n"
+    assert scan_headers(content, "utf-8") == [
+        ("section1", 11, 23),
+        ("section2", 34, 46),
+    ]
+
+
+def test_scan_headers_crlf():
+    content = b"[section1]\r\na\r\n[section2],,\r\nb\r\n"
+    assert scan_headers(content, "utf-8") == [
+        ("section1", 12, 15),
+        ("section2", 29, 32),
+    ]
+
+
+def test_scan_headers_skips_preamble_and_data():
+    content = b"preamble\n[x],1\n[section1]\n[\n"
+    assert scan_headers(content, "utf-8") == [("section1", 26, 28)]
+
+
+def test_scan_headers_header_at_end_without_newline():
+    content = b"[section1]\na\n[section2]"
+    assert scan_headers(content, "utf-8") == [
+        ("section1", 11, 13),
+        ("section2", 23, 23),
+    ]
+
+
+@pytest.mark.parametrize("content", [b"", b"a,b,c\n", b"\n\n"])
+def test_scan_headers_without_sections(content):
+    assert scan_headers(content, "utf-8") == []
+
+
+def test_scan_headers_non_ascii_names():
+    content = "[séction]\nü\n".encode("utf-8")
+    assert scan_headers(content, "utf-8") == [("séction", 11, 14)]
+
+
+def test_scan_text_headers():
+    content = "preamble\n[séction1]\nü,b\n[section2]\n[x],1\n"
+    assert scan_text_headers(content) == [
+        ("séction1", 20, 24),
+        ("section2", 35, 41),
+    ]
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("[a]", "a"),
+    ("[a]\n", "a"),
+    ("[a],,\r\n", "a"),
+    (" [a] ", "a"),
+    ('"[a,b]",', "a,b"),
+    ('""[a]', "a"),
+    ("[a]b]", "a]b"),
+    ("[a] ,, ", None),
+    ('"[a]"x,y', None),
+    ("a", None),
+    ("", None),
+])
+def test_parse_header(line, expected):
+    assert parse_header(line) == expected
+
+
+@pytest.mark.parametrize("space", [" ", "\t", "\xa0", "\u3000"])
+def test_scan_headers_after_whitespace_and_quotes(space):
+    content = f'x\n{space}[a]\n1\n"{space}[b]"\n2\n'
+    assert scan_text_headers(content) == [
+        ("a", 6 + len(space), 8 + len(space)),
+        ("b", 14 + 2 * len(space), 16 + 2 * len(space)),
+    ]
+    encoded = content.encode("utf-8")
+    assert [name for name, _, _ in scan_headers(encoded, "utf-8")] \
+        == ["a", "b"]
+
+
+@pytest.mark.parametrize("content, expected", [
+    (b"a\r\nb\r\n", False),
+    (b"a\nb\n", False),
+    (b"a\rb\r", True),
+    (b"a\r\nb\r", True),
+])
+def test_has_lone_cr(content, expected):
+    assert has_lone_cr(content) is expected
@@ -1,4 +1,5 @@
 
+import _pyio
 import io
 from typing import TextIO
 import pytest
@@ -129,8 +130,6 @@ def test_truncate_with_arg(base_textio):
     base_textio.seek(0)
     assert base_textio.read() == """\
 Hello Worla
-test
- is a
 test
 """
 
@@ -161,6 +160,14 @@ def test_iter(base_textio):
     lines = list(sub_text)
     assert lines == ["World,\n", "this is "]
 
+def test_iter_after_write(base_textio):
+    sub_text = SubTextIO(base_textio, start=6, end=21)
+    sub_text.write("Earth,\nthat")
+    sub_text.seek(2)
+    assert list(sub_text) == ["rth,\n", "that is "]
+    with pytest.raises(StopIteration):
+        next(sub_text)
+
 def test_context_manager(base_textio):
     with SubTextIO(base_textio, start=6, end=21) as sub_text:
         sub_text.write("ContextWrite")
@@ -348,6 +355,15 @@ def test_readlines_with_huge_hint(base_textio):
     assert sub_text.readlines(hint=100) == ["World,\n", "this is "]
     assert sub_text.readlines(hint=100) == []
 
+def test_readlines_rest(base_textio):
+    sub_text = SubTextIO(base_textio, start=0, end=28)
+    assert sub_text.read(3) == "Hel"
+    assert sub_text.readlines() == ["lo World,\n", "this is a\n", "test\n"]
+    assert sub_text.readlines() == []
+    sub_text.seek(6)
+    sub_text.write("W")
+    assert sub_text.readlines() == ["orld,\n", "this is a\n", "test\n"]
+
 def test_readlines_with_zero_hint(base_textio):
     sub_text = SubTextIO(base_textio, start=6, end=21)
     assert sub_text.readlines(hint=0) == ["World,\n"]
@@ -413,6 +429,15 @@ def test_invalid_range_past_initial(base_textio):
     with pytest.raises(EndsBeyondBaseContent):
         SubTextIO(base_textio, start=5, end=40)
 
+def test_known_base_length(base_textio):
+    base_textio.seek(3)
+    with pytest.raises(EndsBeyondBaseContent):
+        SubTextIO(base_textio, start=5, end=20, base_length=15)
+
+    sub_text = SubTextIO(base_textio, start=21, end=28, base_length=28)
+    assert sub_text.is_at_end
+    assert base_textio.tell() == 3
+
 def test_no_readable_requirement():
     import tempfile
 
@@ -468,3 +493,160 @@ def test_not_writable(tmp_path):
             assert sub_text.read() == ""
             sub_text.flush()  # should be a noop.
             sub_text.flush()  # should be a noop.
+
+def test_write_after_truncate_below_position(base_textio):
+    sub_text = SubTextIO(base_textio, start=6, end=21)
+    sub_text.seek(10)
+    sub_text.truncate(3)
+    sub_text.write("ld")
+    sub_text.seek(0)
+    assert sub_text.read() == "World"
+
+@pytest.mark.parametrize("replacement", ["", "short", "x" * 100000])
+def test_flush_moves_long_tail(replacement):
+    tail = "".join(f"line {i}\n" for i in range(30000))
+    base = io.StringIO("head\n" + "middle\n" + tail)
+    sub_text = SubTextIO(base, start=5, end=12)
+    sub_text.write(replacement)
+    sub_text.truncate()
+    sub_text.flush()
+
+    base.seek(0)
+    assert base.read() == "head\n" + replacement + tail
+
+def test_flush_grows_section_before_lone_surrogate():
+    base = io.StringIO("[a]\nab\n[b]\n\udcff\n")
+    sub_text = SubTextIO(base, start=4, end=7)
+    sub_text.write("longer\n")
+    sub_text.flush()
+
+    assert base.getvalue() == "[a]\nlonger\n[b]\n\udcff\n"
+
+def test_flush_grows_section_in_file_with_surrogateescape(tmp_path):
+    path = tmp_path / "example.csv"
+    path.write_bytes(b"[a]\nab\n[b]\n\xff\n")
+
+    with path.open("r+", encoding="utf-8", errors="surrogateescape") as base:
+        sub_text = SubTextIO(base, start=4, end=7)
+        sub_text.write("longer\n")
+        sub_text.flush()
+
+    assert path.read_bytes() == b"[a]\nlonger\n[b]\n\xff\n"
+
+@pytest.mark.parametrize("replacement", ["éé", "x", "ü\n", "abcd", "é"])
+def test_flush_non_ascii_in_file(tmp_path, replacement):
+    path = tmp_path / "example.csv"
+    path.write_text("[a]\nab\n[b]\ncd\n", encoding="utf-8")
+
+    with path.open("r+", encoding="utf-8") as base:
+        sub_text = SubTextIO(base, start=4, end=7)
+        sub_text.write(replacement)
+        sub_text.truncate()
+        sub_text.flush()
+
+    assert path.read_text(encoding="utf-8") == \
+        "[a]\n" + replacement + "[b]\ncd\n"
+
+@pytest.mark.parametrize("newline, original, replacement", [
+    ("\n", "123456\n", "a\nb\nc\n"),
+    ("\r\n", "123456\n", "a\nb\nc\n"),
+    ("\n", "1\n2\n", "x\n"),
+    ("\r\n", "1\n2\n3\n", "x\n"),
+])
+def test_flush_with_newline_translation(tmp_path, monkeypatch,
+                                        newline, original, replacement):
+    # Writes "\n" as "\r\n", as text files do on Windows by default.
+    monkeypatch.setattr(os, "linesep", "\r\n")
+    monkeypatch.setattr("multicsv.subtextio._CHUNK_SIZE", 4)
+    header = "[a]\n".replace("\n", newline).encode()
+    tail = "[b]\nx\ny\nz\n"
+    path = tmp_path / "example.csv"
+    path.write_bytes(header + (original + tail).replace("\n", newline).encode())
+
+    with _pyio.open(path, "r+", encoding="utf-8") as base:
+        end = len(header) + len(original.replace("\n", newline))
+        sub_text = SubTextIO(base, start=len(header), end=end)
+        sub_text.write(replacement)
+        sub_text.truncate()
+        sub_text.flush()
+
+    assert path.read_bytes() == \
+        header + (replacement + tail).replace("\n", "\r\n").encode()
+
+@pytest.mark.parametrize("in_file", [False, True])
+@pytest.mark.parametrize("replacement", ["9,2\n3,4\n", "9\n3,4\n", "9,2,3,4"])
+def test_flush_without_growing_does_not_spool(tmp_path, monkeypatch,
+                                              in_file, replacement):
+    def spool_tail(self, source, destination, content=""):
+        raise AssertionError("the tail was spooled")
+
+    monkeypatch.setattr(SubTextIO, "_spool_tail", spool_tail)
+    monkeypatch.setattr("multicsv.subtextio._CHUNK_SIZE", 4)
+    content = "[a]\n1,2\n3,4\n[b]\n5\n6\n7\n"
+    path = tmp_path / "example.csv"
+    path.write_text(content)
+
+    with (path.open("r+") if in_file else io.StringIO(content)) as base:
+        sub_text = SubTextIO(base, start=4, end=12)
+        sub_text.write(replacement)
+        sub_text.truncate()
+        sub_text.flush()
+        base.seek(0)
+        assert base.read() == "[a]\n" + replacement + "[b]\n5\n6\n7\n"
+
+def test_multiple_flushes_with_resize(base_textio):
+    sub_text = SubTextIO(base_textio, start=6, end=21)
+    sub_text.write("Longer than the section")
+    sub_text.flush()
+    sub_text.truncate(2)
+    sub_text.flush()
+
+    base_textio.seek(0)
+    assert base_textio.read() == "Hello Loa\ntest\n"
+
+def test_content_is_read_on_first_access(base_textio):
+    sub_text = SubTextIO(base_textio, start=6, end=21)
+    assert sub_text.tell() == 0
+    sub_text.seek(0)
+
+    base_textio.seek(6)
+    base_textio.write("Earth")
+    assert sub_text.read() == "Earth,\nthis is "
+
+
+class CountingStringIO(io.StringIO):
+    reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+@pytest.mark.parametrize("modify", [
+    lambda sub_text: sub_text.truncate(),
+    lambda sub_text: sub_text.truncate(0),
+    lambda sub_text: sub_text.write("Replacement of it all"),
+])
+def test_overwrite_does_not_read_base(modify):
+    base = CountingStringIO("Hello World,\nthis is a\ntest\n")
+    sub_text = SubTextIO(base, start=6, end=21)
+    modify(sub_text)
+    assert base.reads == 0
+
+    sub_text.flush()
+    assert sub_text.getvalue() + "a\ntest\n" == base.getvalue()[6:]
+
+def test_read_and_write_across_flushes(base_textio):
+    sub_text = SubTextIO(base_textio, start=6, end=21)
+    assert sub_text.readline(3) == "Wor"
+    assert sub_text.readline() == "ld,\n"
+    sub_text.write("THIS")
+    assert sub_text.read() == " is "
+    sub_text.flush()
+
+    assert sub_text.tell() == 15
+    sub_text.seek(0)
+    assert sub_text.readlines() == ["World,\n", "THIS is "]
+    sub_text.seek(7)
+    sub_text.write("that")
+    assert sub_text.getvalue() == "World,\nthat is "